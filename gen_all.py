@@ -3,7 +3,10 @@ import csv
 import sys
 import re
 import os.path
-import glob
+import json
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 from gen_best_times import ExpectedColumns as BestTimesColumns
 from gen_best_times import main as GenBestTimes
@@ -13,68 +16,92 @@ from gen_black_ribbons import TailColumns as BlackTailColumns
 from gen_black_ribbons import MeetColumns as BlackMeetColumns
 from gen_black_ribbons import main as GenBlackRibbons
 
-def is_best_times_file(file):
+# remembers which csv files were found by the last directory scan
+_CacheFile = '.fhst_cache.json'
+
+def read_header(file):
     try:
-        with open(file,mode='r') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-        assert len(header) == len(BestTimesColumns)
-        for found,expected in zip(header,BestTimesColumns):
-            assert found == expected
-    except:
-        return False
-    return True
+        with open(file,mode='r',newline='',encoding='utf-8') as f:
+            return next(csv.reader(f), None)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None
+
+def is_best_times_file(file):
+    header = read_header(file)
+    return header is not None and tuple(header) == tuple(BestTimesColumns)
         
 def validate_black_ribbon_file(file):
+    header = read_header(file)
+    if header is None:
+        return None
+
+    n_lead = len(BlackLeadColumns)
+    n_tail = len(BlackTailColumns)
+    n_meet = len(BlackMeetColumns)
+    n_meet_columns = len(header) - n_lead - n_tail
+    if n_meet_columns <= 0:
+        return None
+    n_meets,n_extra = divmod(n_meet_columns,n_meet)
+    if n_extra:
+        return None
+
+    meet_columns = tuple( 
+        f"Meet{i+1}-{mc}" 
+        for i in range(n_meets) 
+        for mc in BlackMeetColumns )
+
+    expected_columns = (
+        BlackLeadColumns + meet_columns + BlackTailColumns )
+    if tuple(header) != expected_columns:
+        return None
+
+    # only need the first line with a result for each meet, so stop
+    #   scanning as soon as every meet has been accounted for
+    pending = list(range(n_meets))
+    meets_in_file = dict()
     try:
-        with open(file,mode='r') as f:
+        with open(file,mode='r',newline='',encoding='utf-8') as f:
             reader = csv.reader(f)
-            header = next(reader)
-
-            n_lead = len(BlackLeadColumns)
-            n_tail = len(BlackTailColumns)
-            n_meet = len(BlackMeetColumns)
-            n_meet_columns = len(header) - n_lead - n_tail
-            assert n_meet_columns > 0
-            n_meets,n_extra = divmod(n_meet_columns,n_meet)
-            assert n_extra == 0
-
-            meet_columns = tuple( 
-                f"Meet{i+1}-{mc}" 
-                for i in range(n_meets) 
-                for mc in BlackMeetColumns )
-
-            expected_columns = (
-                BlackLeadColumns + meet_columns + BlackTailColumns )
-            for found,expected in zip(header,expected_columns):
-                assert found == expected
-
-            meets_in_file = dict()
+            next(reader)
             for line in reader:
-                for meet in range(n_meets):
+                for meet in tuple(pending):
                     if line[n_lead + 2 + meet*n_meet]:
-                        if meet not in meets_in_file:
-                            meets_in_file[meet] = line[n_lead + meet*n_meet]
-
-    except:
+                        meets_in_file[meet] = line[n_lead + meet*n_meet]
+                        pending.remove(meet)
+                if not pending:
+                    break
+    except (OSError, UnicodeDecodeError, csv.Error, IndexError):
         return None
-    else:
-        return meets_in_file
+
+    return meets_in_file
     
 
-best_times_file = None
-best_times_mtime = 0
-black_ribbon_file = None
-black_ribbon_meets = None
-
-csv_dir = os.path.dirname(os.path.abspath(__file__))
-for file in glob.glob(f"{csv_dir}/*.csv"):
-    if is_best_times_file(file):
-        s = os.stat(file)
-        if s.st_mtime > best_times_mtime:
-            best_times_mtime = s.st_mtime
+def scan_csv_files(entries):
+    best_times_file = None
+    black_ribbon_file = None
+    black_ribbon_meets = None
+
+    # files too small to hold the expected column names needn't be opened
+    min_best_times_size = len(','.join(BestTimesColumns))
+    min_black_ribbon_size = len(','.join(BlackLeadColumns + BlackTailColumns))
+
+    # newest first, so the first best times file found is the one we want
+    entries = sorted(entries, key=lambda e: e.stat().st_mtime, reverse=True)
+
+    for entry in entries:
+        file = entry.path
+        size = entry.stat().st_size
+        if (
+            best_times_file is None and
+            size >= min_best_times_size and
+            is_best_times_file(file)
+        ):
             best_times_file = file
-    else:
+            continue
+
+        if size < min_black_ribbon_size:
+            continue
+
         meets = validate_black_ribbon_file(file)
         if meets:
             if black_ribbon_file:
@@ -85,18 +112,108 @@ for file in glob.glob(f"{csv_dir}/*.csv"):
                 black_ribbon_file = file
                 black_ribbon_meets = meets
 
+    return best_times_file, black_ribbon_file, black_ribbon_meets
+
+
+def find_csv_files(csv_dir):
+    with os.scandir(csv_dir) as it:
+        entries = [
+            e for e in it
+            if e.name.endswith('.csv') and not e.name.startswith('.') and e.is_file()
+        ]
+
+    # the scan only needs redoing if a csv file was added, removed, or changed
+    signature = sorted(
+        [e.name, e.stat().st_size, e.stat().st_mtime_ns] for e in entries )
+
+    cache_file = os.path.join(csv_dir, _CacheFile)
+    try:
+        with open(cache_file,mode='r') as f:
+            cache = json.load(f)
+        if cache['signature'] == signature:
+            return (
+                os.path.join(csv_dir, cache['best_times_file']),
+                os.path.join(csv_dir, cache['black_ribbon_file']),
+                { int(meet):name for meet,name in cache['black_ribbon_meets'].items() },
+            )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    best_times_file, black_ribbon_file, black_ribbon_meets = scan_csv_files(entries)
+
+    if best_times_file and black_ribbon_file:
+        cache = {
+            'signature': signature,
+            'best_times_file': os.path.basename(best_times_file),
+            'black_ribbon_file': os.path.basename(black_ribbon_file),
+            'black_ribbon_meets': black_ribbon_meets,
+        }
+        try:
+            with open(cache_file,mode='w') as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+
+    return best_times_file, black_ribbon_file, black_ribbon_meets
+
+
+def main():
+    csv_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # no need to go looking for the csv files if we've been told where they are
+    best_times_file = os.environ.get('FHST_BEST_TIMES_CSV')
+    black_ribbon_file = os.environ.get('FHST_BLACK_RIBBON_CSV')
+    black_ribbon_meets = None
+
+    for var,pinned in (
+        ('FHST_BEST_TIMES_CSV', best_times_file),
+        ('FHST_BLACK_RIBBON_CSV', black_ribbon_file),
+    ):
+        assert not pinned or os.path.isfile(pinned), f"{var}: No such file {pinned}"
+
+    if not (best_times_file and black_ribbon_file):
+        found_best_times, found_black_ribbon, found_meets = find_csv_files(csv_dir)
+        if not best_times_file:
+            best_times_file = found_best_times
+        if not black_ribbon_file:
+            black_ribbon_file = found_black_ribbon
+            black_ribbon_meets = found_meets
+
+    if black_ribbon_file and black_ribbon_meets is None:
+        black_ribbon_meets = validate_black_ribbon_file(black_ribbon_file)
+        assert black_ribbon_meets, f"{black_ribbon_file} is not an athlete report card"
+
+    assert best_times_file, f"No best times file found in {csv_dir}"
+    assert black_ribbon_file, f"No athlete report card found in {csv_dir}"
+
+    ribbon_pdfs = dict()
+    for meet,name in black_ribbon_meets.items():
+        if meet == 0: continue
+        name = name.lower().split(" ")
+        ab = name[0]
+        team = '_'.join(name[3:])
+        ribbon_pdfs[meet] = f"{csv_dir}/black_ribbons_{ab}_{team}.pdf"
+
+    # meets whose names reduce to the same file name would otherwise be
+    #   written to the same pdf at the same time, so number them
+    counts = Counter(ribbon_pdfs.values())
+    for meet,pdf_out in ribbon_pdfs.items():
+        if counts[pdf_out] > 1:
+            (root,ext) = os.path.splitext(pdf_out)
+            ribbon_pdfs[meet] = f"{root}_{meet}{ext}"
 
-assert best_times_file, f"No best times file found in {csv_dir}"
-assert black_ribbon_file, f"No athlete report card found in {csv_dir}"
+    # the reports are independent of one another, so build them all at once
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        pdf_out = f"{csv_dir}/best_times.pdf"
+        jobs = [ executor.submit(GenBestTimes, best_times_file, dst=pdf_out) ]
 
-pdf_out = f"{csv_dir}/best_times.pdf"
-GenBestTimes(best_times_file,pdf_out)
+        for meet,pdf_out in ribbon_pdfs.items():
+            jobs.append(
+                executor.submit(GenBlackRibbons, black_ribbon_file, dst=pdf_out, meet=meet)
+            )
 
-for meet,name in black_ribbon_meets.items():
-    if meet == 0: continue
-    name = name.lower().split(" ")
-    ab = name[0]
-    team = '_'.join(name[3:])
-    pdf_out = f"{csv_dir}/black_ribbons_{ab}_{team}.pdf"
-    GenBlackRibbons(black_ribbon_file, dst=pdf_out, meet=meet)
+        for job in jobs:
+            job.result()
 
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import re
 import os.path
 import datetime
 
+from operator import itemgetter
+
 from fpdf import FPDF
 
 
@@ -78,6 +80,10 @@ _AgeEvents = {
 
 _AllEvents = tuple(f"{d} {e}" for e in _EventNames for d in _EventDistances[e])
 
+# layout of the (empty) data returned by read_data
+_DataTemplate = tuple( (ag, tuple(_AgeEvents[ag])) for ag in _AgeGroups )
+_KnownEvents = frozenset( (ag, e) for ag,events in _DataTemplate for e in events )
+
 ############################################################
 # Output page layout
 ############################################################
@@ -125,11 +131,11 @@ _ContPad     = 2
 ############################################################
 
 def read_data(src):
-    lines = list()
     try:
-        with open(src,mode='r') as file:
+        with open(src,mode='r',newline='',encoding='utf-8') as file:
             reader = csv.reader(file)
-            lines = [line for line in reader]
+            header = next(reader, [])
+            lines = list(reader)
     except FileNotFoundError:
         print(f"Sorry:: Could not find {src}")
         sys.exit(1)
@@ -137,37 +143,43 @@ def read_data(src):
         print(f"Sorry:: Failed to parse {src}: {e}")
         sys.exit(1)
 
-    header = lines[:1][0]
-    lines = lines[1:]
-
     try:
         n_expected_columns = len(ExpectedColumns)
         assert len(header) == n_expected_columns, (
             f"Best times file should have {n_expected_columns} columns of data"
         )
-        for i,(found,expected) in enumerate(zip(header,ExpectedColumns)):
-            assert found==expected, f"Column {i+1} should be {expected}, not {found}"
+        if tuple(header) != tuple(ExpectedColumns):
+            # only need to hunt for the mismatch when there is one
+            for i,(found,expected) in enumerate(zip(header,ExpectedColumns)):
+                assert found==expected, f"Column {i+1} should be {expected}, not {found}"
     except Exception as e:
         print(f"Sorry:: {src} does not appear to be properly formatted:\n\n {e}")
         sys.exit(1)
 
     data = {
-        ag:{e:list() for e in _AgeEvents[ag]}
-        for ag in _AgeGroups
+        ag:{e:list() for e in events}
+        for ag,events in _DataTemplate
     }
 
-    for line in lines:
-        (age_group, first_name, last_name, age, event, _, _, time, date, _) = line
+    unknown = {line[0] for line in lines if line}.difference(_AgeGroups)
+    assert not unknown, f"Unrecognized age group in data: {', '.join(sorted(unknown))}"
 
-        assert age_group in _AgeGroups, f"Unrecognized age group in data: {age_group}"
+    for i,line in enumerate(lines):
+        try:
+            (age_group, first_name, last_name, age, event, _, _, time, date, _) = line
+        except ValueError:
+            print(f"Sorry:: {src} does not appear to be properly formatted:\n\n "
+                f"Line {i+2} should have {n_expected_columns} columns of data, not {len(line)}")
+            sys.exit(1)
 
+        # an f-string builds each name in a single allocation, which measures
+        #   faster than either str.format or %-formatting here
         swimmer = f"{first_name} {last_name} ({age})"
         time = int(time)/100
 
-        if age_group not in data:
-            raise KeyError(f"Unrecognized age_group: {age_group}")
-
-        if event not in data[age_group]:
+        # swim ups are rare, so only check data for them when the event
+        #   isn't one normally swum by the age group
+        if (age_group, event) not in _KnownEvents and event not in data[age_group]:
             print(f"Swim up is adding {event} to {age_group}")
             data[age_group][event] = list()
 
@@ -188,7 +200,7 @@ def gen_unformatted_events(data):
            ]
 
 def gen_unformatted_swimmers(data):
-    return sorted(data,key=lambda x:x[1])
+    return sorted(data,key=itemgetter(1))
 
 
 ############################################################
@@ -196,6 +208,12 @@ def gen_unformatted_swimmers(data):
 ############################################################
 
 class PDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # every page should show the same generation time
+        now = datetime.datetime.now()
+        self.generated_at = now.strftime("%A %B %d, %Y  at  %-I:%M %p")
+
     def header(self):
         self.set_font(*_HeaderFont)
         self.set_y(_HeaderPad + _HeaderHeight)
@@ -205,20 +223,16 @@ class PDF(FPDF):
             )
 
     def footer(self):
-        now = datetime.datetime.now()
-        now = now.strftime("%A %B %d, %Y  at  %-I:%H %p")
         self.set_font(*_FooterFont)
         self.set_y(-_FooterPad-_FooterHeight)
         self.cell(0,_FooterHeight, f"Page {self.page_no()}", align='R')
         self.set_y(-_FooterPad-_FooterHeight)
-        self.cell(0,_FooterHeight, f"Generated: {now}")
+        self.cell(0,_FooterHeight, f"Generated: {self.generated_at}")
 
 def format_time(t):
-    if t >= 60:
-        (m,s) = divmod(t,60)
-        return f"{int(m)}:{s:05.2f}"
-    else:
-        return f"{t:.2f}"
+    if t < 60:
+        return "%.2f" % t
+    return "%d:%05.2f" % divmod(t,60)
 
 def add_page(pdf, w_col, age_group=None):
     pdf.add_page()
@@ -237,13 +251,20 @@ def add_page(pdf, w_col, age_group=None):
         pdf.set_font(*_ContFont)
         pdf.cell(w_col - _AgeGroupIndent - dx, _AgeGroupHeight, '(cont)')
 
-def gen_formatted_report(data,dst):
+def layout_report(pdf, data, w_col):
+    # Works out where everything goes before anything is drawn.  Returns
+    #   a list of pages, each holding the age group continued onto that
+    #   page (if any) and the cells to draw on it:
+    #     (font, x, y, width, height, text, align)
+    #   A y of None continues on the same line as the previous cell.
 
-    pdf = PDF(format=_PageFormat)
+    w_name = w_col - (_SwimmerIndent + _TimeWidth + _CellPad + _ColumnPad)
 
-    w_col = (_RightEdge - _LeftEdge) // _ColumnCount
+    # only needed for measuring the swimmer names
+    pdf.set_font(*_SwimmerFont)
 
-    add_page(pdf,w_col)
+    cells = list()
+    pages = [ (None, cells) ]
 
     c = 0
     x = _LeftEdge
@@ -258,15 +279,15 @@ def gen_formatted_report(data,dst):
             c += 1
             x += w_col
             y = _TopEdge
-            if c > 2:
-                add_page(pdf,w_col)
+            if c == _ColumnCount:
+                cells = list()
+                pages.append( (None, cells) )
                 c = 0
                 x = _LeftEdge
 
         # add age group header to output
-        pdf.set_font(*_AgeGroupFont)
-        pdf.set_xy(x + _AgeGroupIndent, y)
-        pdf.cell(w_col-_AgeGroupIndent, _AgeGroupHeight, ag)
+        cells.append( (_AgeGroupFont, x + _AgeGroupIndent, y,
+            w_col-_AgeGroupIndent, _AgeGroupHeight, ag, '') )
         y += _AgeGroupHeight
 
         for event,swimmers in events:
@@ -277,35 +298,62 @@ def gen_formatted_report(data,dst):
                 c += 1
                 x += w_col
                 y = _TopEdge
-                if c > 2:
-                    add_page(pdf,w_col,age_group=ag)
+                if c == _ColumnCount:
+                    cells = list()
+                    pages.append( (ag, cells) )
                     c = 0
                     x = _LeftEdge
                     y += _AgeGroupHeight
 
-            pdf.set_font(*_EventFont)
-            pdf.set_xy(x+_EventIndent,y)
-            pdf.cell(w_col-_EventIndent,_EventHeight,event)
+            cells.append( (_EventFont, x+_EventIndent, y,
+                w_col-_EventIndent, _EventHeight, event, '') )
             y += _EventHeight
 
             for name, time, _ in swimmers:
-                pdf.set_font(*_SwimmerFont)
-                w_name = w_col - (_SwimmerIndent + _TimeWidth + _CellPad + _ColumnPad)
+                # shrink names that are too wide for the column
+                font = _SwimmerFont
                 w_actual = pdf.get_string_width(name)
                 if w_actual > w_name:
                     scaled_size = _SwimmerFont[2] * w_name / w_actual
-                    pdf.set_font( _SwimmerFont[0], _SwimmerFont[1], scaled_size)
-                pdf.set_xy(x + _SwimmerIndent, y)
-                pdf.cell(w_name, _SwimmerHeight, name)
-
-                pdf.set_font(*_SwimmerFont)
-                pdf.set_x(x + w_col - _TimeWidth - _ColumnPad)
-                pdf.cell(_TimeWidth, _SwimmerHeight, format_time(time),align="R")
+                    font = [_SwimmerFont[0], _SwimmerFont[1], scaled_size]
+
+                cells.append( (font, x + _SwimmerIndent, y,
+                    w_name, _SwimmerHeight, name, '') )
+                # stay on the name's line, even if the name cell spilled onto
+                #   a new page when an event is too long for a column
+                cells.append( (_SwimmerFont, x + w_col - _TimeWidth - _ColumnPad, None,
+                    _TimeWidth, _SwimmerHeight, format_time(time), 'R') )
                 y += _SwimmerHeight
 
             y += _EventPad
         y += _AgeGroupPad
 
+    return pages
+
+def gen_formatted_report(data,dst,compress=True):
+
+    pdf = PDF(format=_PageFormat)
+    pdf.set_compression(compress)
+
+    w_col = (_RightEdge - _LeftEdge) // _ColumnCount
+
+    pages = layout_report(pdf, data, w_col)
+
+    for cont_age_group, cells in pages:
+        add_page(pdf, w_col, age_group=cont_age_group)
+
+        # adding a page changes the font, so start tracking it afresh
+        current_font = None
+        for font, x, y, w, h, text, align in cells:
+            if font != current_font:
+                pdf.set_font(*font)
+                current_font = font
+            if y is None:
+                pdf.set_x(x)
+            else:
+                pdf.set_xy(x, y)
+            pdf.cell(w, h, text, align=align)
+
     pdf.output(dst,'F')
 
 
@@ -313,10 +361,14 @@ def gen_formatted_report(data,dst):
 # Main
 ############################################################
 
-def main(src,dst):
+def main(src, dst=None, compress=True):
+    if dst is None:
+        (root,ext) = os.path.splitext(src)
+        dst = f"{root}.pdf"
+
     data = read_data(src)
     report = gen_unformatted_report(data)
-    gen_formatted_report(report,dst)
+    gen_formatted_report(report,dst,compress)
 
 def parse_args():
     epilog = """
@@ -352,15 +404,18 @@ def parse_args():
         help='name of output pdf file',
     )
 
-    args = parser.parse_args()
-    if args.dst is None:
-        (root,ext) = os.path.splitext(args.src)
-        args.dst = f"{root}.pdf"
+    parser.add_argument(
+        '--no-compress',
+        dest='compress',
+        action='store_false',
+        default=True,
+        help='write an uncompressed pdf (faster to generate, but a larger file)',
+    )
 
-    return args
+    return parser.parse_args()
 
  
 if __name__ == "__main__":
     args = parse_args()
-    main(args.src,args.dst)
+    main(args.src, dst=args.dst, compress=args.compress)
   
@@ -116,6 +116,14 @@ _DateWidth = 0.5 * _inch
 _DeltaWidth = 0.5 * _inch
 _CellPad = 1
 
+# top left corner of the text on each label of a page, in fill order
+#   (down each column, then across the page)
+_LabelPositions = tuple(
+    ( _LeftEdge + c*(_LabelWidth + _WidthGap) + _LabelLeftMargin,
+      _TopEdge + r*(_LabelHeight + _HeightGap) + _LabelTopMargin )
+    for c in range(_NumColumns)
+    for r in range(_NumRows) )
+
 ############################################################
 # Data Parsing
 ############################################################
@@ -124,13 +132,20 @@ _NumLeadColumns = len(LeadColumns)
 _NumTailColumns = len(TailColumns)
 _NumColumnsPerMeet = len(MeetColumns)
 
+_MeetColumnOffsets = { mc:i for i,mc in enumerate(MeetColumns) }
+
+def _meet_column(meet, column):
+    return _NumLeadColumns + meet*_NumColumnsPerMeet + _MeetColumnOffsets[column]
+
 
 def read_data(src):
-    lines = list()
+    # the labels are built by indexing each line by column, so every
+    #   line is kept in memory as parsed by the csv module
     try:
-        with open(src,mode='r') as file:
+        with open(src,mode='r',newline='',encoding='utf-8') as file:
             reader = csv.reader(file)
-            lines = [line for line in reader]
+            header = next(reader, [])
+            lines = list(reader)
     except FileNotFoundError:
         print(f"Sorry:: Could not find {src}")
         sys.exit(1)
@@ -138,9 +153,6 @@ def read_data(src):
         print(f"Sorry:: Failed to parse {src}: {e}")
         sys.exit(1)
 
-    header = lines[:1][0]
-    lines = lines[1:]
-
     try:
 
         n_col = len(header)
@@ -161,23 +173,27 @@ def read_data(src):
             tuple( f"Meet{i+1}-{mc}" for i in range(n_meet) for mc in MeetColumns ) +
             TailColumns )
 
-        for i,(found,expected) in enumerate(zip(header,expected_columns)):
-            assert found==expected, (
-                f"Column {i+1} should be {expected}, not {found}" )
+        if tuple(header) != expected_columns:
+            # only need to hunt for the mismatch when there is one
+            for i,(found,expected) in enumerate(zip(header,expected_columns)):
+                assert found==expected, (
+                    f"Column {i+1} should be {expected}, not {found}" )
 
     except Exception as e:
         print(f"Sorry:: {src} does not appear to be properly formatted:\n\n {e}")
         sys.exit(1)
 
-    meets = [None for i in range(n_meet)]
-    for line in lines:
-        for i in range(n_meet):
-            start = _NumLeadColumns + i*_NumColumnsPerMeet
-            end   = start + _NumColumnsPerMeet
-            (meet_name, result, _, _, _, date) = line[start:end]
-
-            if meet_name and result and meets[i] is None:
-                meets[i] = (meet_name, date)
+    # each meet's name and date come from the first line with a result
+    #   for that meet, so stop looking as soon as one is found
+    meets = list()
+    for i in range(n_meet):
+        name_col = _meet_column(i, 'Name')
+        result_col = _meet_column(i, 'Result')
+        date_col = _meet_column(i, 'Date')
+        meets.append( next(
+            ( (line[name_col], line[date_col]) for line in lines
+              if line[name_col] and line[result_col] ),
+            None ) )
 
     return meets, lines
 
@@ -192,28 +208,22 @@ def gen_unformatted_labels(data,meet):
     return labels
 
 def gen_unformatted_label(line,meet):
-    (age_group, _, last_name, first_name, _, age, distance, stroke) = line[:8]
-
-    times = tuple( line[_NumLeadColumns + 2 + i*_NumColumnsPerMeet]
-        for i in range(meet+1)
-        )
-
-    meet_time = times[-1]
-
+    # most athletes don't swim every event at every meet, so check the
+    #   meet time before doing any work on the prior times
+    meet_time = line[_meet_column(meet, 'ResultSec')]
     if not meet_time:
         return None
 
     meet_time = float(meet_time)
 
-    prior_times = tuple(float(t) for t in times[:-1] if t)
-    if not prior_times:
+    prior_times = (line[_meet_column(i, 'ResultSec')] for i in range(meet))
+    prior_best = min(map(float, filter(None, prior_times)), default=None)
+    if prior_best is None or meet_time >= prior_best:
         return None
 
-    prior_best = min(prior_times)
-    if meet_time >= prior_best:
-        return None
+    (age_group, _, last_name, first_name, _, age, distance, stroke) = line[:8]
 
-    date = line[_NumLeadColumns + 5 + meet*_NumColumnsPerMeet]
+    date = line[_meet_column(meet, 'Date')]
 
     return { 
         'meet':meet,
@@ -261,15 +271,14 @@ def select_latest_meet(meets,src):
 ############################################################
 
 def format_time(t):
-    if t >= 60:
-        (m,s) = divmod(t,60)
-        return f"{int(m)}:{s:05.2f}"
-    else:
-        return f"{t:.2f}"
+    if t < 60:
+        return "%.2f" % t
+    return "%d:%05.2f" % divmod(t,60)
 
-def gen_formatted_labels(labels,meets,dst):
+def gen_formatted_labels(labels,meets,dst,compress=True):
 
     pdf = FPDF(format=_PageFormat)
+    pdf.set_compression(compress)
 
     pdf.add_page()
     pdf.set_auto_page_break(auto=False)
@@ -277,13 +286,13 @@ def gen_formatted_labels(labels,meets,dst):
     line_height = (_LabelHeight - _LabelTopMargin - _LabelBottomMargin) / 4
     line_width  = (_LabelWidth - _LabelLeftMargin - _LabelRightMargin)
 
-    r = 0
-    c = 0
-    for label in labels:
-        (meet_name,meet_date) = meets[label["meet"]]
+    for i,label in enumerate(labels):
+        slot = i % len(_LabelPositions)
+        if i and not slot:
+            pdf.add_page()
+        (x,y) = _LabelPositions[slot]
 
-        x = _LeftEdge + c*(_LabelWidth + _WidthGap) + _LabelLeftMargin
-        y = _TopEdge + r*(_LabelHeight + _HeightGap) + _LabelTopMargin
+        (meet_name,meet_date) = meets[label["meet"]]
 
         pdf.set_font(*_NameFont)
         pdf.set_xy(x,y)
@@ -321,21 +330,13 @@ def gen_formatted_labels(labels,meets,dst):
         time_drop = format_time(label['time_drop'])
         pdf.cell(_DeltaWidth, line_height, f"-{time_drop}S")
 
-        r += 1
-        if r == _NumRows:
-            r = 0
-            c += 1
-            if c == _NumColumns:
-                c = 0
-                pdf.add_page()
-
     pdf.output(dst,'F')
 
 ############################################################
 # Main
 ############################################################
 
-def main(src, *, dst=None, meet=None, show_list=False ):
+def main(src, *, dst='black_ribbons.pdf', meet=None, show_list=False, compress=True ):
     meets, data = read_data(src)
 
     if show_list:
@@ -348,7 +349,7 @@ def main(src, *, dst=None, meet=None, show_list=False ):
         meet = select_latest_meet(meets, src)
 
     labels = gen_unformatted_labels(data,meet)
-    gen_formatted_labels(labels,meets,dst)
+    gen_formatted_labels(labels,meets,dst,compress)
     
 
 def parse_args():
@@ -408,6 +409,14 @@ def parse_args():
         help='list meet information rather than create ribbons',
         )
 
+    parser.add_argument(
+        '--no-compress',
+        dest='compress',
+        action='store_false',
+        default=True,
+        help='write an uncompressed pdf (faster to generate, but a larger file)',
+        )
+
     return parser.parse_args()
 
  
@@ -421,6 +430,8 @@ if __name__ == "__main__":
         kwargs['meet'] = args.meet
     if args.list:
         kwargs['show_list'] = args.list
+    if not args.compress:
+        kwargs['compress'] = args.compress
 
     main(args.src, **kwargs)
   